@@ -14,11 +14,220 @@ License:
 
 
 
+import ctypes
+import functools
+import math
 import os, os.path
-import random
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
 
 import numpy as np
-from PIL import Image, ImageFilter
+from PIL import Image, ImageFilter, ImageMode
+
+# Optional, SIMD accelerated resampling and filtering, PIL and NumPy are used otherwise
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# Optional, SIMD accelerated JPEG decoding through libjpeg-turbo
+try:
+    from turbojpeg import TurboJPEG, TJCS_GRAY, TJCS_RGB, TJCS_YCbCr, TJPF_GRAY, TJPF_RGB
+    _turbo_jpeg = TurboJPEG()
+except (ImportError, RuntimeError, OSError):
+    _turbo_jpeg = None
+
+# Optional, compiles the resampling kernel used when OpenCV is not installed
+try:
+    from numba import njit, prange, set_num_threads
+except ImportError:
+    njit = None
+
+# Optional, C resampling kernel used when OpenCV is not installed, built from `warp.c` next to this file
+try:
+    _libwarp = ctypes.CDLL(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'warp.so'))
+    _image_ptr = np.ctypeslib.ndpointer(dtype=np.uint8, flags='C_CONTIGUOUS')
+    _vector_ptr = np.ctypeslib.ndpointer(dtype=np.float32, ndim=1, flags='C_CONTIGUOUS')
+    _libwarp.remap_bilinear.argtypes = [_image_ptr, _image_ptr] + [ctypes.c_int] * 5 + [_vector_ptr] * 4 + [ctypes.c_int]
+    _libwarp.remap_bilinear.restype = None
+    _libwarp.warp_set_num_threads.argtypes = [ctypes.c_int]
+    _libwarp.warp_set_num_threads.restype = None
+except (OSError, AttributeError):
+    # Not built, or built from an older `warp.c` missing these functions
+    _libwarp = None
+
+
+
+# Image modes whose pixel arrays can be filtered by OpenCV directly, others (e.g. palette) fall back to PIL
+_ARRAY_MODES = ('L', 'RGB', 'RGBA')
+
+# Pixel types `cv2.remap` can interpolate, others (e.g. 32-bit integer or bilevel images) fall back to NumPy
+_REMAP_DTYPES = (np.uint8, np.uint16, np.int16, np.float32, np.float64)
+
+
+
+@functools.lru_cache(maxsize=64)
+def _warp_grids(width, height):
+    ''' Returns read-only pixel coordinates and their phases for an image size, shaped to broadcast against each other '''
+    # A row of X coordinates and a column of Y coordinates broadcast to the full mesh grid when combined
+    x_coords = np.arange(width, dtype=np.float32)[np.newaxis, :]
+    y_coords = np.arange(height, dtype=np.float32)[:, np.newaxis]
+    twopi_y_over_h = np.float32(2 * np.pi / height) * y_coords
+    twopi_x_over_w = np.float32(2 * np.pi / width) * x_coords
+
+    grids = (x_coords, y_coords, twopi_y_over_h, twopi_x_over_w)
+    for grid in grids:
+        grid.setflags(write=False)
+    return grids
+
+def _split_planes(arr):
+    ''' Splits a HxW or HxWxC array into a list of contiguous HxW channel planes '''
+    if arr.ndim == 2:
+        return [arr]
+    return [np.ascontiguousarray(arr[..., c]) for c in range(arr.shape[2])]
+
+def _merge_planes(planes, ndim):
+    ''' Reassembles channel planes into an array of the given number of dimensions '''
+    return planes[0] if ndim == 2 else np.stack(planes, axis=2)
+
+def _remap(src, map_x, map_y, constant_border):
+    ''' Bilinearly samples an image at the given coordinates, outside pixels are black or clamped to the border '''
+    if cv2 is not None and src.dtype in _REMAP_DTYPES:
+        border = cv2.BORDER_CONSTANT if constant_border else cv2.BORDER_REPLICATE
+        return cv2.remap(src, map_x, map_y, cv2.INTER_LINEAR, borderMode=border, borderValue=0)
+
+    # Sample positions in an image padded by one pixel, so taps outside the image read the border
+    height, width = src.shape[0] + 2, src.shape[1] + 2
+    sample_x = np.clip(map_x + 1, 0, width - 1)
+    sample_y = np.clip(map_y + 1, 0, height - 1)
+    x0 = np.minimum(sample_x.astype(np.intp), width - 2)
+    y0 = np.minimum(sample_y.astype(np.intp), height - 2)
+    fx, fy = sample_x - x0, sample_y - y0
+
+    # Interpolate in single precision, or double precision where e.g. 32-bit integers need it
+    work_dtype = np.result_type(src.dtype, np.float32)
+
+    # Gather from each channel plane separately, the indices and weights are shared
+    planes = []
+    for plane in _split_planes(src):
+        padded = np.pad(plane, 1, mode='constant' if constant_border else 'edge').astype(work_dtype)
+        top = padded[y0, x0] * (1 - fx) + padded[y0, x0 + 1] * fx
+        bottom = padded[y0 + 1, x0] * (1 - fx) + padded[y0 + 1, x0 + 1] * fx
+        value = top * (1 - fy) + bottom * fy
+
+        # Integer and bilevel pixels are rounded to the nearest value, floating point ones are kept as they are
+        if not np.issubdtype(src.dtype, np.floating):
+            value = np.floor(value + 0.5)
+        planes.append(value.astype(src.dtype))
+    return _merge_planes(planes, src.ndim)
+
+if njit is not None:
+    @njit(inline='always', fastmath=True)
+    def _tap_numba(src, y, x, constant_border):
+        ''' Reads a source pixel, outside pixels are black or clamped to the border '''
+        height, width = src.shape
+        if constant_border:
+            return src[y, x] if 0 <= y < height and 0 <= x < width else 0
+        return src[min(max(y, 0), height - 1), min(max(x, 0), width - 1)]
+
+    @njit(inline='always', fastmath=True)
+    def _remap_plane_numba(src, row_x, column_x, row_y, column_y, constant_border):
+        ''' Bilinearly samples a HxW uint8 plane at the separable coordinates of `_remap_separable`, in one pass
+            without building the sampling maps '''
+        dst = np.empty((column_x.shape[0], row_x.shape[0]), dtype=np.uint8)
+
+        for y in prange(dst.shape[0]):
+            for x in range(dst.shape[1]):
+                sx = row_x[x] + column_x[y]
+                sy = row_y[x] + column_y[y]
+
+                x0, y0 = int(math.floor(sx)), int(math.floor(sy))
+                fx, fy = sx - x0, sy - y0
+
+                top = _tap_numba(src, y0, x0, constant_border) * (1 - fx) + _tap_numba(src, y0, x0 + 1, constant_border) * fx
+                bottom = _tap_numba(src, y0 + 1, x0, constant_border) * (1 - fx) + _tap_numba(src, y0 + 1, x0 + 1, constant_border) * fx
+                dst[y, x] = np.uint8(top * (1 - fy) + bottom * fy + 0.5)
+        return dst
+
+    def _remap_replicate_numba(src, row_x, column_x, row_y, column_y):
+        ''' `_remap_plane_numba` clamping outside coordinates to the border '''
+        return _remap_plane_numba(src, row_x, column_x, row_y, column_y, False)
+
+    def _remap_constant_numba(src, row_x, column_x, row_y, column_y):
+        ''' `_remap_plane_numba` filling outside pixels with black '''
+        return _remap_plane_numba(src, row_x, column_x, row_y, column_y, True)
+
+    @functools.lru_cache(maxsize=None)
+    def _remap_numba():
+        ''' Returns the resampling kernels indexed by `constant_border`, compiled or loaded from the disk cache on first use '''
+        # Each kernel inlines the shared body for one border mode, which folds the border checks away, and is compiled
+        # for contiguous planes and vectors only, so it is never JIT compiled again per image size. Compiling is left
+        # until the first use in a worker, loading parallel kernels starts Numba's threading layer, which does not
+        # survive the process pool forking
+        signature = 'u1[:, ::1](u1[:, ::1], f4[::1], f4[::1], f4[::1], f4[::1])'
+        return tuple(njit(signature, parallel=True, fastmath=True, cache=True)(kernel) for kernel in (_remap_replicate_numba, _remap_constant_numba))
+else:
+    _remap_numba = None
+
+def _remap_separable(src, row_x, column_x, row_y, column_y, constant_border):
+    ''' Bilinearly samples an image at coordinates that are the sum of a per-column and a per-row term, i.e.
+        map_x[y, x] = row_x[x] + column_x[y] and likewise for Y, outside pixels are black or clamped to the border '''
+    if cv2 is None and _libwarp is not None and src.dtype == np.uint8:
+        # Without OpenCV, the C kernel samples the interleaved image straight from the rows and columns
+        src = np.ascontiguousarray(src)
+        out_height, out_width = len(column_x), len(row_x)
+        dst = np.empty((out_height, out_width) + src.shape[2:], dtype=np.uint8)
+        vectors = [np.ascontiguousarray(v, dtype=np.float32) for v in (row_x, column_x, row_y, column_y)]
+        channels = 1 if src.ndim == 2 else src.shape[2]
+        _libwarp.remap_bilinear(src, dst, src.shape[0], src.shape[1], channels, out_height, out_width, *vectors, int(constant_border))
+        return dst
+
+    if cv2 is None and _remap_numba is not None and src.dtype == np.uint8:
+        # Without OpenCV, the compiled kernel samples each channel plane straight from the rows and columns
+        remap_kernel = _remap_numba()[bool(constant_border)]
+        # The compiled signature takes writable contiguous arrays, read-only inputs such as the cached grids are copied
+        vectors = [np.require(v, np.float32, 'CW') for v in (row_x, column_x, row_y, column_y)]
+        planes = [remap_kernel(np.require(plane, np.uint8, 'CW'), *vectors) for plane in _split_planes(src)]
+        return _merge_planes(planes, src.ndim)
+
+    # Broadcast the rows and columns to the full sampling maps
+    map_x = row_x[np.newaxis, :] + column_x[:, np.newaxis]
+    map_y = row_y[np.newaxis, :] + column_y[:, np.newaxis]
+    return _remap(src, map_x, map_y, constant_border)
+
+def _box_blur(arr, radius, passes=1):
+    ''' Box blurs an array like PIL, all horizontal passes first and then all vertical ones, a fractional radius
+        gives the outermost taps a partial weight '''
+    whole = math.floor(radius)
+    kernel = np.ones(2 * whole + 3, dtype=np.float32)
+    kernel[[0, -1]] = radius - whole
+    kernel /= 2 * radius + 1
+
+    for _ in range(passes):
+        arr = cv2.filter2D(arr, -1, kernel[np.newaxis, :], borderType=cv2.BORDER_REPLICATE)
+    for _ in range(passes):
+        arr = cv2.filter2D(arr, -1, kernel[:, np.newaxis], borderType=cv2.BORDER_REPLICATE)
+    return arr
+
+def _gaussian_box_radius(sigma, passes):
+    ''' Returns the box radius PIL repeats to approximate a Gaussian blur, from Gwosdek et al.,
+        "Theoretical foundations of Gaussian convolution by extended box filtering" '''
+    sigma2 = sigma * sigma / passes
+    whole = math.floor((math.sqrt(12 * sigma2 + 1) - 1) / 2)
+    return whole + (2 * whole + 1) * (whole * (whole + 1) - 3 * sigma2) / (6 * (sigma2 - (whole + 1) * (whole + 1)))
+
+def _contrast_levels(factor):
+    ''' Returns a function that scales values away from mid-gray by a factor '''
+    return lambda c: 128 + factor * (c - 128)
+
+def _brightness_levels(factor):
+    ''' Returns a function that scales values by a factor '''
+    return lambda c: factor * c
+
+def _levels_lut(levels):
+    ''' Tabulates a levels function as a 256 entry uint8 lookup table '''
+    # Values are rounded like PIL does for `Image.point` with a function
+    return np.clip(np.rint(levels(np.arange(256))), 0, 255).astype(np.uint8)
 
 
 
@@ -27,52 +236,110 @@ from PIL import Image, ImageFilter
 class AugmentedImage():
     ''' Wraps the PIL image class providing simple, builder-style transformations '''
     def __init__(self, image):
-        self.img = image
+        # The pixels are held as a PIL image, a NumPy array, or both, and converted lazily when needed
+        self._pil = image
+        self._arr = None
 
     @classmethod
     def open(cls, path):
         ''' Creates an Augmented Image from a file path '''
+        if _turbo_jpeg is not None and os.path.splitext(path)[1].lower() in ('.jpg', '.jpeg'):
+            with open(path, 'rb') as file:
+                buffer = file.read()
+
+            # Decode straight to an array, keeping grayscale images single channel like PIL does
+            colorspace = _turbo_jpeg.decode_header(buffer)[3]
+            if colorspace == TJCS_GRAY:
+                return cls.from_array(_turbo_jpeg.decode(buffer, pixel_format=TJPF_GRAY)[..., 0])
+            if colorspace in (TJCS_YCbCr, TJCS_RGB):
+                return cls.from_array(_turbo_jpeg.decode(buffer, pixel_format=TJPF_RGB))
+
+        # Other formats, and colorspaces such as CMYK, are decoded by PIL
         return cls(Image.open(path))
 
+    @classmethod
+    def from_array(cls, arr):
+        ''' Creates an Augmented Image from a HxW or HxWxC NumPy array '''
+        aug_img = cls(None)
+        aug_img._arr = arr
+        return aug_img
+
+    @property
+    def img(self):
+        ''' The image as a PIL image '''
+        if self._pil is None:
+            self._pil = Image.fromarray(self._arr)
+        return self._pil
+
+    @property
+    def arr(self):
+        ''' The image as a read-only NumPy array '''
+        if self._arr is None:
+            self._arr = np.asarray(self._pil)
+        return self._arr
+
+    @property
+    def size(self):
+        ''' The image size as (width, height) '''
+        if self._arr is not None:
+            return self._arr.shape[1], self._arr.shape[0]
+        return self._pil.size
+
+    def _is_array_mode(self):
+        ''' Whether the pixels can be processed as a plain array rather than through PIL '''
+        return self._arr is not None or self._pil.mode in _ARRAY_MODES
+
+    def _point(self, levels, lut=None):
+        ''' Maps every pixel value through a levels function, tabulated as a uint8 lookup table for 8-bit bands '''
+        if self._arr is not None and self._arr.dtype == np.uint8:
+            lut = _levels_lut(levels) if lut is None else lut
+            if cv2 is not None:
+                return AugmentedImage.from_array(cv2.LUT(self._arr, lut))
+            return AugmentedImage.from_array(np.take(lut, self._arr))
+
+        # Images with more bits per band (e.g. 16-bit grayscale) only support the function itself
+        if ImageMode.getmode(self.img.mode).typestr != '|u1':
+            return AugmentedImage(self.img.point(levels))
+
+        # PIL applies the table in C, one table per band
+        lut = _levels_lut(levels) if lut is None else lut
+        return AugmentedImage(self.img.point(lut.tolist() * len(self.img.getbands())))
+
 
     def warp(self, amplitude, frequency):
         ''' Applies sinusoidal distortions in both the X and Y dimensions '''
-        # Convert image to numpy array
-        img_array = np.array(self.img)
-
         # Get image dimensions
-        width, height = self.img.size
-
-        # Create mesh grid for coordinates
-        x_coords, y_coords = np.meshgrid(np.arange(width), np.arange(height))
+        width, height = self.size
+        img_array = self.arr
 
-        # Apply sine wave distortion to x-coordinates
-        distorted_x_coords = x_coords + amplitude * np.sin(2 * np.pi * frequency * y_coords / height)
+        x_coords, y_coords, twopi_y_over_h, twopi_x_over_w = _warp_grids(width, height)
 
-        # Apply sine wave distortion to y-coordinates
-        distorted_y_coords = y_coords + amplitude * np.sin(2 * np.pi * frequency * x_coords / width)
+        # Single precision scalars keep the maps float32, as expected by remap
+        amplitude_f, frequency_f = np.float32(amplitude), np.float32(frequency)
 
-        # Clip distorted coordinates to image boundaries
-        distorted_x_coords = np.clip(distorted_x_coords, 0, width - 1).astype(int)
-        distorted_y_coords = np.clip(distorted_y_coords, 0, height - 1).astype(int)
+        # Apply sine wave distortion to x-coordinates, it only varies by row
+        offset_x = amplitude_f * np.sin(frequency_f * twopi_y_over_h.ravel())
 
-        # Create distorted image
-        distorted_image = np.zeros_like(img_array)
-        for y in range(height):
-            for x in range(width):
-                distorted_image[y, x] = img_array[distorted_y_coords[y, x], distorted_x_coords[y, x]]
+        # Apply sine wave distortion to y-coordinates, it only varies by column
+        offset_y = amplitude_f * np.sin(frequency_f * twopi_x_over_w.ravel())
 
-        # Convert distorted image array back to PIL Image
-        distorted_image_pil = Image.fromarray(distorted_image)
+        # Bilinearly resample the image, out-of-bounds coordinates are clamped to the image borders
+        distorted_image = _remap_separable(img_array, x_coords.ravel(), offset_x, offset_y, y_coords.ravel(), constant_border=False)
 
-        return AugmentedImage(distorted_image_pil)
+        return AugmentedImage.from_array(distorted_image)
 
     def mirror(self):
         ''' Flips the image horizontally '''
+        # Arrays are flipped as a view, without copying
+        if self._arr is not None:
+            return AugmentedImage.from_array(self._arr[:, ::-1])
         return AugmentedImage(self.img.transpose(Image.FLIP_LEFT_RIGHT))
 
     def flip(self):
         ''' Flips the image vertically '''
+        # Arrays are flipped as a view, without copying
+        if self._arr is not None:
+            return AugmentedImage.from_array(self._arr[::-1])
         return AugmentedImage(self.img.transpose(Image.FLIP_TOP_BOTTOM))
 
     def translate(self, x, y):
@@ -82,33 +349,104 @@ class AugmentedImage():
 
     def rotate(self, angle):
         ''' Rotates the image '''
-        return AugmentedImage(self.img.rotate(angle, resample=Image.BICUBIC, expand=1))
+        return AugmentedImage(self.img.rotate(angle, resample=Image.BILINEAR, expand=1))
+
+    def fused_geometric(self, tx, ty, angle, amplitude, frequency):
+        ''' Equivalent to `translate(tx, ty).rotate(angle).warp(amplitude, frequency)` resampled in a single pass '''
+        width, height = self.size
+
+        # Inverse rotation matrix about the image center, built exactly as `Image.rotate` does to map output pixels back onto the source
+        angle = angle % 360.0
+        a = -math.radians(angle)
+        cos_a, sin_a = round(math.cos(a), 15), round(math.sin(a), 15)
+        center_x, center_y = width / 2, height / 2
+        offset_x = -cos_a * center_x - sin_a * center_y + center_x
+        offset_y = sin_a * center_x - cos_a * center_y + center_y
+
+        # Expanded output size, matching `rotate(angle, expand=1)`
+        corners = ((0, 0), (width, 0), (width, height), (0, height))
+        xx = [cos_a * x + sin_a * y + offset_x for x, y in corners]
+        yy = [-sin_a * x + cos_a * y + offset_y for x, y in corners]
+        out_width = math.ceil(max(xx)) - math.floor(min(xx))
+        out_height = math.ceil(max(yy)) - math.floor(min(yy))
+
+        # PIL transposes quarter turns instead, which only swaps the dimensions
+        if angle in (90, 270):
+            out_width, out_height = height, width
+
+        # Shift the output origin to the expanded image
+        pad_x, pad_y = -(out_width - width) / 2, -(out_height - height) / 2
+        offset_x += cos_a * pad_x + sin_a * pad_y
+        offset_y += -sin_a * pad_x + cos_a * pad_y
+
+        # Output coordinates, shared with `warp` and across variants with the same output size
+        x_coords, y_coords, twopi_y_over_h, twopi_x_over_w = _warp_grids(out_width, out_height)
+
+        # Convert the transform from PIL's continuous coordinates to pixel indices, whose centers sit at
+        # half pixel offsets, then apply the translation
+        offset_x += 0.5 * (cos_a + sin_a) - 0.5 + tx
+        offset_y += 0.5 * (cos_a - sin_a) - 0.5 + ty
+
+        # Per-call constants of the map expressions, single precision keeps the maps float32 as expected by remap
+        amplitude, frequency, cos_a, sin_a, offset_x, offset_y = np.array([amplitude, frequency, cos_a, sin_a, offset_x, offset_y], dtype=np.float32)
+
+        # Each sine displacement only varies along one axis, so evaluate it on a row or column instead of the full grid
+        sin_y = amplitude * np.sin(frequency * twopi_y_over_h.ravel())
+        sin_x = amplitude * np.sin(frequency * twopi_x_over_w.ravel())
+        x_coords, y_coords = x_coords.ravel(), y_coords.ravel()
+
+        # Rotating the warped coordinates keeps every term a function of either X or Y alone, so each
+        # map is the sum of a row and a column
+        row_x, column_x = cos_a * x_coords + sin_a * sin_x + offset_x, cos_a * sin_y + sin_a * y_coords
+        row_y, column_y = cos_a * sin_x - sin_a * x_coords + offset_y, cos_a * y_coords - sin_a * sin_y
+
+        # Bilinearly resample the image, areas outside the source are filled with black like PIL's transforms
+        distorted_image = _remap_separable(self.arr, row_x, column_x, row_y, column_y, constant_border=True)
+
+        return AugmentedImage.from_array(distorted_image)
 
     def blur(self, pixels):
         ''' Blurs the image using a Box blur filter '''
-        return AugmentedImage(self.img.filter(ImageFilter.BoxBlur(pixels)))
+        if cv2 is None or not self._is_array_mode():
+            return AugmentedImage(self.img.filter(ImageFilter.BoxBlur(pixels)))
+        if pixels <= 0:
+            return AugmentedImage.from_array(self.arr)
+
+        return AugmentedImage.from_array(_box_blur(self.arr, pixels))
     
     def gaussian(self, pixels):
         ''' Blurs the image using a Gaussian blur filter '''
-        return AugmentedImage(self.img.filter(ImageFilter.GaussianBlur(pixels)))
+        if cv2 is None or not self._is_array_mode():
+            return AugmentedImage(self.img.filter(ImageFilter.GaussianBlur(pixels)))
+        if pixels <= 0:
+            return AugmentedImage.from_array(self.arr)
+
+        # Three box blur passes approximate the Gaussian, as in PIL, which also blurs noticeably at radii far below a pixel
+        return AugmentedImage.from_array(_box_blur(self.arr, _gaussian_box_radius(pixels, 3), passes=3))
 
     def contrast(self, factor):
         ''' Modifies the image contrast by a given factor (0 to 2) '''
-        def f(c):
-            return 128 + factor * (c - 128)
-        return AugmentedImage(self.img.point(f))
+        return self._point(_contrast_levels(factor))
     
     def brightness(self, factor):
         ''' Modifies the image brightness by a given factor (0 to inf) '''
-        def f(c):
-            return factor * c
-        return AugmentedImage(self.img.point(f))
+        return self._point(_brightness_levels(factor))
 
     def fireflies(self, factor, brightness):
         ''' Converts random pixel to a gray a given brightness, the amount of pixels is a factor of the image (0 to 1) '''
-        def f(c):
-            return brightness if random.random() < factor else c
-        return AugmentedImage(self.img.point(f))
+        # Randomness is per pixel position, so a lookup table does not apply; mask the array instead
+        img_array = self.arr.copy()
+        mask = np.random.default_rng().random(img_array.shape[:2], dtype=np.float32) < factor
+        img_array[mask] = brightness
+        return AugmentedImage.from_array(img_array)
+
+    def fused_levels(self, brightness, contrast):
+        ''' Equivalent to `brightness(brightness).contrast(contrast)` applied as a single lookup table '''
+        contrast_levels, brightness_levels = _contrast_levels(contrast), _brightness_levels(brightness)
+
+        # Composing the tables keeps the intermediate uint8 clipping of the separate operations
+        lut = _levels_lut(contrast_levels)[_levels_lut(brightness_levels)]
+        return self._point(lambda c: contrast_levels(brightness_levels(c)), lut)
 
     def show(self):
         ''' Shows the image in an external window '''
@@ -125,11 +463,7 @@ class AugmentedImage():
 
 
 def generate_variants(aug_img, count):
-    ''' Generates randomized variants from a given image, the number of variants returned is equal to count '''
-
-    def rand(r):
-        diff = abs(r[0] - r[1])
-        return (random.random() * diff) + min(r)
+    ''' Generates randomized variants from a given image, yielding each as soon as it is ready, the number of variants yielded is equal to count '''
 
     # Define minimum and maximum values for randomization
     ranges = {
@@ -144,29 +478,67 @@ def generate_variants(aug_img, count):
         'warp_freq': (1, 5),  # Pixels
     }
 
-    # Memoization to prevent 
-    variants = {}
-    
-    for i in range(count):
-        values = {k: rand(v) for k, v in ranges.items()}
+    # Draw the values for every variant at once, one row per variant. Draws over continuous
+    # ranges practically never repeat, so the variants need no deduplication. A fresh generator
+    # is seeded from the OS, so forked workers never share random state
+    lows, highs = np.array(list(ranges.values())).T
+    samples = np.random.default_rng().uniform(lows, highs, (count, len(ranges)))
+
+    for row in samples:
+        values = dict(zip(ranges, row.tolist()))
+
+        # Generate variant
+        yield aug_img.fused_geometric(values['translate'], values['translate'], values['rotate'], values['warp_amp'], values['warp_freq']) \
+                     .gaussian(values['blur']) \
+                     .fused_levels(values['brightness'], values['contrast'])
+
 
-        # Generate unique key (tuple) from random values
-        key = tuple(values.values())
 
-        if key not in variants:
-            # Generate variant
-            variants[key] = aug_img.translate(values['translate'], values['translate']) \
-                                   .rotate(values['rotate']) \
-                                   .warp(values['warp_amp'], values['warp_freq']) \
-                                   .gaussian(values['blur']) \
-                                   .brightness(values['brightness']) \
-                                   .contrast(values['contrast'])
-        else:
-            # Variant already used, retry iteration
-            i -= 1
-            continue
 
-    return variants.values()
+
+def init_worker():
+    ''' Prepares a worker process for augmenting images '''
+    # Parallelism comes from the process pool, keep OpenCV, Numba and OpenMP from oversubscribing the cores
+    if cv2 is not None:
+        cv2.setNumThreads(1)
+    if njit is not None:
+        set_num_threads(1)
+    if _libwarp is not None:
+        _libwarp.warp_set_num_threads(1)
+
+def write_image(arr, path):
+    ''' Encodes a pixel array and writes it to a file path '''
+    Image.fromarray(arr).save( path )
+
+def process_file(path, path_rel, export_dir, variant_count, io_workers=1):
+    ''' Loads an image, generates its variants, and saves them alongside mirrored copies '''
+    # Load image
+    im = AugmentedImage.open(path)
+
+    # Generate path to export to
+    path_export = os.path.join(export_dir, path_rel)
+
+    # Make sure folders exist
+    os.makedirs(os.path.dirname(path_export), exist_ok = True)
+
+    # Parse name elements
+    args = path_export.split('.')
+    name = '.'.join(args[:-1])
+    extension = args[-1]
+
+    # Encode and write files in background threads while the next variant is generated, PIL releases the GIL while encoding
+    with ThreadPoolExecutor(max_workers=io_workers) as io_pool:
+        writes = []
+        for i, v in enumerate(generate_variants(im, variant_count)):
+            # Save variant to file
+            writes.append(io_pool.submit(write_image, v.arr, f'{name}_{i}.{extension}'))
+
+            # Save mirrored variant to file, flipping a view of the pixels rather than transposing a PIL copy
+            writes.append(io_pool.submit(write_image, v.arr[:, ::-1], f'{name}_{i}m.{extension}'))
+
+        # Surface any errors from the writes
+        for write in writes:
+            write.result()
 
 
 
@@ -183,9 +555,13 @@ if __name__ == '__main__':
     # Variant count
     variant_count = 5
 
+    # Encoding threads per worker process
+    io_workers = 1
 
 
-    # Open up dataset image
+
+    # Collect dataset images
+    paths = []
     for root, _, files in os.walk(source_dir):
         for file in files:
 
@@ -194,31 +570,11 @@ if __name__ == '__main__':
                 continue
 
             # Get source path for image
-            path = (os.path.join(root, file))
-            path_rel = os.path.relpath(path, source_dir)
-
-            # Load image
-            im = AugmentedImage.open(path)
-
-            # Generate variant images
-            variants = generate_variants(im, variant_count)
-
-            # Create files from variants
-            for i, v in enumerate(variants):
-                # Generate path to export to
-                path_export = os.path.join(export_dir, path_rel)
-                
-                # Make sure folders exist
-                os.makedirs(os.path.dirname(path_export), exist_ok = True)
-
-                # Parse name elements
-                args = path_export.split('.')
-                name = '.'.join(args[:-1])
-                extension = args[-1]
-
-                # Save variant to file
-                v.save( f'{name}_{i}.{extension}' )
-
-                # Save mirrored variant to file
-                v.mirror().save( f'{name}_{i}m.{extension}' )
-    
\ No newline at end of file
+            paths.append(os.path.join(root, file))
+
+    paths_rel = [os.path.relpath(path, source_dir) for path in paths]
+
+    # Images are independent, so augment them in parallel across all cores. Encoding dominates the run time, so
+    # the encoding threads share the cores with the workers rather than taking workers away
+    with ProcessPoolExecutor(initializer=init_worker) as executor:
+        list(executor.map(process_file, paths, paths_rel, repeat(export_dir), repeat(variant_count), repeat(io_workers)))
@@ -0,0 +1,60 @@
+''' Checks that the interchangeable resampling backends produce the same images '''
+
+import numpy as np
+import pytest
+
+import main
+from main import AugmentedImage
+
+
+
+# Backends in the order `_remap_separable` and `_remap` prefer them
+BACKENDS = ('cv2', 'c', 'numba', 'numpy')
+
+def _images():
+    ''' Returns L, RGB and RGBA arrays, and a mirrored view, which is not contiguous '''
+    rng = np.random.default_rng(0)
+    rgba = rng.integers(0, 256, (37, 53, 4), dtype=np.uint8)
+    return {'L': rgba[..., 0], 'RGB': rgba[..., :3], 'RGBA': rgba, 'mirrored': rgba[:, ::-1, :3]}
+
+def _use_backend(monkeypatch, backend):
+    ''' Disables every backend preferred over the given one, skipping when it is not available '''
+    available = {'cv2': main.cv2, 'c': main._libwarp, 'numba': main._remap_numba, 'numpy': True}
+    if available[backend] is None:
+        pytest.skip(f'{backend} is not available')
+
+    for name, attribute in (('cv2', 'cv2'), ('c', '_libwarp'), ('numba', '_remap_numba')):
+        if name == backend:
+            break
+        monkeypatch.setattr(main, attribute, None)
+
+def _transforms():
+    ''' Returns the resampling transforms, covering both border modes '''
+    return {
+        'warp': lambda im: im.warp(3.5, 2),
+        'fused_geometric': lambda im: im.fused_geometric(1.5, -2, 17, 2.5, 3),
+    }
+
+
+
+@pytest.mark.parametrize('transform', _transforms())
+@pytest.mark.parametrize('image', _images())
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_backends_match_numpy(monkeypatch, backend, image, transform):
+    arr = _images()[image]
+    apply = _transforms()[transform]
+
+    with monkeypatch.context() as patch:
+        _use_backend(patch, 'numpy')
+        expected = apply(AugmentedImage.from_array(arr)).arr
+
+    _use_backend(monkeypatch, backend)
+    result = apply(AugmentedImage.from_array(arr)).arr
+
+    assert result.shape == expected.shape
+    assert result.dtype == expected.dtype
+
+    # Compiled kernels may contract the interpolation into fused multiply-adds, which can flip a rounding tie
+    difference = np.abs(result.astype(np.int16) - expected)
+    assert difference.max() <= 1
+    assert np.count_nonzero(difference) <= 1e-3 * difference.size
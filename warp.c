@@ -0,0 +1,78 @@
+/*
+ * Bilinear resampling of separable sampling maps, used by main.py when OpenCV is not installed.
+ *
+ * Build with:
+ *     cc -O3 -march=native -fopenmp -shared -fPIC warp.c -o warp.so -lm
+ */
+
+#include <math.h>
+#include <stddef.h>
+#include <stdint.h>
+
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
+
+
+/* Limits the OpenMP threads used by the kernel, so pool workers do not oversubscribe the cores */
+void warp_set_num_threads(int threads)
+{
+#ifdef _OPENMP
+    omp_set_num_threads(threads);
+#else
+    (void)threads;
+#endif
+}
+
+/* Returns the offset of a source pixel, or -1 for black when it lies outside with a constant border */
+static inline ptrdiff_t tap(int y, int x, int H, int W, int C, int constant_border)
+{
+    if (constant_border) {
+        if (y < 0 || y >= H || x < 0 || x >= W)
+            return -1;
+    } else {
+        /* Clamping the coordinates to the image replicates its border */
+        y = y < 0 ? 0 : (y >= H ? H - 1 : y);
+        x = x < 0 ? 0 : (x >= W ? W - 1 : x);
+    }
+    return ((ptrdiff_t)y * W + x) * C;
+}
+
+/*
+ * Resamples a HxWxC interleaved uint8 image from src into the out_H x out_W x C dst, matching
+ * `_remap_separable`: the source of dst[y, x] is (row_x[x] + column_x[y], row_y[x] + column_y[y])
+ */
+void remap_bilinear(const uint8_t* src, uint8_t* dst, int H, int W, int C, int out_H, int out_W,
+                    const float* row_x, const float* column_x, const float* row_y, const float* column_y,
+                    int constant_border)
+{
+    #pragma omp parallel for
+    for (int y = 0; y < out_H; y++) {
+        for (int x = 0; x < out_W; x++) {
+            const float sx = row_x[x] + column_x[y];
+            const float sy = row_y[x] + column_y[y];
+
+            const int x0 = (int)floorf(sx), y0 = (int)floorf(sy);
+            const float fx = sx - x0, fy = sy - y0;
+
+            /* 4-tap bilinear interpolation over all channels */
+            const ptrdiff_t p00 = tap(y0, x0, H, W, C, constant_border);
+            const ptrdiff_t p01 = tap(y0, x0 + 1, H, W, C, constant_border);
+            const ptrdiff_t p10 = tap(y0 + 1, x0, H, W, C, constant_border);
+            const ptrdiff_t p11 = tap(y0 + 1, x0 + 1, H, W, C, constant_border);
+            uint8_t* out = dst + ((size_t)y * out_W + x) * C;
+
+            for (int c = 0; c < C; c++) {
+                const float v00 = p00 < 0 ? 0.0f : src[p00 + c];
+                const float v01 = p01 < 0 ? 0.0f : src[p01 + c];
+                const float v10 = p10 < 0 ? 0.0f : src[p10 + c];
+                const float v11 = p11 < 0 ? 0.0f : src[p11 + c];
+
+                const float top = v00 * (1 - fx) + v01 * fx;
+                const float bottom = v10 * (1 - fx) + v11 * fx;
+                out[c] = (uint8_t)(top * (1 - fy) + bottom * fy + 0.5f);
+            }
+        }
+    }
+}